@@ -1,24 +1,113 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from pan_json import PANProcessor
+from pan_dedup import PerceptualIndex
+from pan_cpu import CPUBudget
 import os
+import json
+import queue
+import threading
+import time
 import uuid
 from datetime import datetime
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'output'
-processor = PANProcessor()
+app.config['HASH_INDEX'] = os.path.join('output', 'pan_hashes.db')
+app.config['DEDUP'] = True
+app.config['DUPLICATE_THRESHOLD'] = 10
+# Clients downscale uploads so the longest side is at most this many pixels
+app.config['INPUT_MAX_DIMENSION'] = 1600
+app.config['INPUT_QUALITY'] = 0.85
+app.config['INPUT_FORMATS'] = {'image/webp': '.webp', 'image/jpeg': '.jpg', 'image/png': '.png'}
+# Number of requests expected to be processed at once; CPU threads are split between them
+app.config['WORKERS'] = 4
 
-# Create directories on startup
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+processors = None
+processors_lock = threading.Lock()
+
+def get_processors():
+    """Build the processor pool from app.config on first use, so the config can be changed before then"""
+    global processors
+    with processors_lock:
+        if processors is None:
+            # One processor per worker, since the model is not thread-safe; all share the index and budget
+            dedup_index = None
+            if app.config['DEDUP']:
+                dedup_index = PerceptualIndex(app.config['HASH_INDEX'], threshold=app.config['DUPLICATE_THRESHOLD'])
+            cpu_budget = CPUBudget(workers=app.config['WORKERS'])
+            pool = queue.Queue()
+            for _ in range(app.config['WORKERS']):
+                pool.put(PANProcessor(dedup_index=dedup_index, cpu_budget=cpu_budget))
+            processors = pool
+        return processors
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/api/config')
+def input_config():
+    return jsonify({
+        'max_dimension': app.config['INPUT_MAX_DIMENSION'],
+        'quality': app.config['INPUT_QUALITY'],
+        'formats': list(app.config['INPUT_FORMATS']),
+    })
+
+def save_upload(file):
+    """Save the uploaded file under a timestamped name"""
+    original_name = os.path.splitext(file.filename)[0]
+    extension = os.path.splitext(file.filename)[1] or app.config['INPUT_FORMATS'].get(file.mimetype, '')
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    filename = f"{original_name}_{timestamp}{extension}"
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    file.save(filepath)
+    return filepath, f"{original_name}_{timestamp}"
+
+def process_upload(filepath, output_name, progress=None):
+    """Process an image on a pooled processor and save its JSON output if complete"""
+    pool = get_processors()
+    # Extra requests wait here rather than oversubscribing the CPU
+    processor = pool.get()
+    try:
+        data, missing = processor.process_image(filepath, progress=progress)
+        if not missing:
+            processor.save_to_json(data, f"{output_name}.json", app.config['OUTPUT_FOLDER'])
+        return data, missing
+    finally:
+        pool.put(processor)
+
+def build_result(data, missing, start):
+    """Build the response payload with its status code"""
+    if missing:
+        return {
+            'status': 'error',
+            'message': f"Missing fields: {', '.join(missing)}",
+            'missing_fields': missing
+        }, 400
+
+    payload = {
+        'status': 'success',
+        'data': data,
+        'metrics': {
+            'bytes_received': request.content_length,
+            'server_ms': round((time.perf_counter() - start) * 1000),
+        },
+    }
+    # Near-duplicates return the stored record; make that visible to the caller
+    if 'duplicate_of' in data:
+        payload['duplicate'] = {'duplicate_of': data['duplicate_of'], 'distance': data['distance']}
+    return payload, 200
+
+def sse(event, data):
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/api/process', methods=['POST'])
 def process_pan():
+    start = time.perf_counter()
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     
@@ -27,36 +116,68 @@ def process_pan():
         return jsonify({'error': 'Empty filename'}), 400
 
     try:
-        # Generate timestamped filename
-        original_name = os.path.splitext(file.filename)[0]
-        extension = os.path.splitext(file.filename)[1]
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"{original_name}_{timestamp}{extension}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        file.save(filepath)
+        filepath, output_name = save_upload(file)
         
         # Process image
-        data, missing = processor.process_image(filepath)
-        
-        if missing:
-            return jsonify({
-                'status': 'error',
-                'message': f"Missing fields: {', '.join(missing)}",
-                'missing_fields': missing
-            }), 400
-            
-        # Save JSON output
-        json_filename = f"{original_name}_{timestamp}.json"
-        saved_json_path = processor.save_to_json(data, json_filename)
-        
-        return jsonify({
-            'status': 'success',
-            'data': data,
-        })
+        data, missing = process_upload(filepath, output_name)
+        payload, status = build_result(data, missing, start)
+        return jsonify(payload), status
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/process/stream', methods=['POST'])
+def process_pan_stream():
+    """Same as /api/process, but streams stage and field events as server-sent events"""
+    start = time.perf_counter()
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'Empty filename'}), 400
+
+    try:
+        filepath, output_name = save_upload(file)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    events = queue.Queue()
+
+    def run():
+        try:
+            data, missing = process_upload(filepath, output_name, progress=events.put)
+            events.put(('result', (data, missing)))
+        except Exception as e:
+            events.put(('error', str(e)))
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def generate():
+        yield sse('stage', {'stage': 'upload', 'progress': 0.0})
+        while True:
+            event = events.get()
+            if isinstance(event, dict):
+                if event.get('field') and event.get('value'):
+                    yield sse('field', {'field': event['field'], 'value': event['value']})
+                yield sse('stage', {'stage': event['stage'], 'progress': event['progress']})
+                continue
+
+            kind, payload = event
+            if kind == 'error':
+                yield sse('result', {'error': payload})
+            else:
+                try:
+                    result, _ = build_result(*payload, start)
+                    yield sse('result', result)
+                except Exception as e:
+                    yield sse('result', {'error': str(e)})
+            return
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
+    # Load the models before the first request rather than during it
+    get_processors()
     app.run(debug=True)
\ No newline at end of file
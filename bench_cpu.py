@@ -0,0 +1,81 @@
+# bench_cpu.py
+import glob
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pan_cpu import CPUBudget
+from pan_json import PANProcessor
+from pan_stats import percentile
+
+
+def run_config(processors, image_paths, workers, threads, tasks):
+    """Process `tasks` images with the given budget and return throughput and latency"""
+    budget = CPUBudget(workers=workers, threads=threads)
+    budget.apply()
+
+    def timed(path):
+        processor = processors.get()
+        try:
+            start = time.perf_counter()
+            processor.process_image(path)
+            return time.perf_counter() - start
+        finally:
+            processors.put(processor)
+
+    jobs = [image_paths[i % len(image_paths)] for i in range(tasks)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(timed, jobs))
+    wall = time.perf_counter() - start
+
+    return {
+        "workers": workers,
+        "threads": threads,
+        "throughput": tasks / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "settings": budget.settings(),
+    }
+
+
+def sweep(image_paths, cores=None, tasks=None):
+    """Try worker/thread combinations and return results sorted best first"""
+    cores = cores or os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, cores // 2, cores} & set(range(1, cores + 1)))
+
+    processors = queue.Queue()
+    for _ in range(max(worker_counts)):
+        processors.put(PANProcessor())
+
+    results = []
+    for workers in worker_counts:
+        for threads in sorted({1, max(1, cores // workers), cores}):
+            result = run_config(processors, image_paths, workers, threads,
+                                tasks or max(len(image_paths), workers * 4))
+            # Print what is in effect: torch's inter-op count is fixed by the first config
+            settings = result["settings"]
+            print(f"workers={workers:<3} torch={settings['torch_threads']:<3} "
+                  f"interop={settings['torch_interop_threads']:<3} opencv={settings['opencv_threads']:<3} "
+                  f"tesseract={settings['tesseract_threads']:<3} "
+                  f"{result['throughput']:6.2f} img/s  "
+                  f"p50={result['p50_ms']:7.0f}ms  p99={result['p99_ms']:7.0f}ms")
+            results.append(result)
+
+    return sorted(results, key=lambda r: (-r["throughput"], r["p99_ms"]))
+
+
+if __name__ == "__main__":
+    input_path = input("Enter image path or directory: ").strip('"')
+    cores = int(input(f"Cores to budget for [{os.cpu_count()}]: ").strip() or os.cpu_count())
+
+    if os.path.isdir(input_path):
+        image_paths = glob.glob(os.path.join(input_path, "*.[pj][np][gG]*")) + \
+                     glob.glob(os.path.join(input_path, "*.[jJ][pP][eE][gG]*"))
+    else:
+        image_paths = [input_path]
+
+    results = sweep(image_paths, cores)
+    best = results[0]
+    print(f"\n✅ Best for {cores} cores: workers={best['workers']}, threads per worker={best['threads']} "
+          f"({best['throughput']:.2f} img/s, p99 {best['p99_ms']:.0f}ms)")
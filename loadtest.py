@@ -0,0 +1,283 @@
+# loadtest.py
+import argparse
+import http.client
+import json
+import os
+import random
+import string
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+import cv2
+import numpy as np
+from pan_stats import percentile
+
+HISTOGRAM_BUCKETS_MS = [50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+def synthetic_card(seed):
+    """Render a fake PAN card as JPEG bytes; text only, so it exercises upload and detection, not OCR"""
+    rng = random.Random(seed)
+    img = np.full((638, 1011, 3), (235, 225, 210), dtype=np.uint8)
+    img += np.random.default_rng(seed).integers(0, 20, img.shape, dtype=np.uint8)
+
+    def name():
+        return " ".join(
+            "".join(rng.choices(string.ascii_uppercase, k=rng.randint(4, 8))) for _ in range(2)
+        )
+
+    pan = "".join(rng.choices(string.ascii_uppercase, k=5)) + \
+        "".join(rng.choices(string.digits, k=4)) + rng.choice(string.ascii_uppercase)
+    dob = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}"
+
+    lines = [
+        ("INCOME TAX DEPARTMENT", 60, 0.9),
+        (name(), 200, 1.0),
+        (name(), 280, 1.0),
+        (dob, 360, 1.0),
+        ("Permanent Account Number", 440, 0.7),
+        (pan, 500, 1.2),
+    ]
+    for text, y, scale in lines:
+        cv2.putText(img, text, (60, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2, cv2.LINE_AA)
+
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def multipart(filename, data):
+    """Build a multipart/form-data body with a single file field"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class LoadGenerator:
+    """Replays card uploads against /api/process and records every response"""
+
+    def __init__(self, url, cards, timeout=120):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = parsed.path or "/api/process"
+        self.cards = cards
+        self.timeout = timeout
+        self.results = []
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _next_card(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter, self.cards[self._counter % len(self.cards)]
+
+    def send(self, scheduled=None):
+        """Upload one card; latency is measured from `scheduled` when given"""
+        idx, card = self._next_card()
+        body, content_type = multipart(f"card_{idx}.jpg", card)
+        start = scheduled or time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            conn.request("POST", self.path, body, {"Content-Type": content_type})
+            status = conn.getresponse().status
+            conn.close()
+        except Exception as e:
+            status = type(e).__name__
+        result = (status, time.perf_counter() - start)
+        with self._lock:
+            self.results.append(result)
+
+    def closed_loop(self, concurrency, duration):
+        """Each of `concurrency` clients sends its next upload as soon as the last returns"""
+        deadline = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                self.send()
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def open_loop(self, rate, duration, max_inflight=256):
+        """Send uploads at Poisson arrivals of `rate` per second, regardless of responses"""
+        start = time.perf_counter()
+        next_arrival = start
+        with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+            while next_arrival < start + duration:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, next_arrival)
+                next_arrival += random.expovariate(rate)
+
+
+def summarize(results, wall):
+    """Throughput, status breakdown, latency percentiles and histogram.
+
+    Latency covers every completed HTTP response, whatever its status, since
+    a 400 for missing fields still went through the whole pipeline. Requests
+    that got no response at all are counted separately as transport errors.
+    """
+    latencies = [latency * 1000 for status, latency in results if isinstance(status, int)]
+    statuses = {}
+    transport_errors = {}
+    for status, _ in results:
+        counts = statuses if isinstance(status, int) else transport_errors
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    succeeded = statuses.get("200", 0)
+
+    histogram = {}
+    lower = 0
+    for upper in HISTOGRAM_BUCKETS_MS + [None]:
+        label = f"{lower}-{upper}ms" if upper else f">{lower}ms"
+        histogram[label] = sum(1 for l in latencies if l >= lower and (upper is None or l < upper))
+        lower = upper
+
+    total = len(results)
+    return {
+        "requests": total,
+        "wall_seconds": round(wall, 2),
+        "responses": len(latencies),
+        "throughput": round(len(latencies) / wall, 3) if wall else 0,
+        "success_throughput": round(succeeded / wall, 3) if wall else 0,
+        "success_rate": round(succeeded / total, 4) if total else 0,
+        "statuses": statuses,
+        "transport_errors": transport_errors,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=None),
+        },
+        "histogram_ms": histogram,
+    }
+
+
+def print_report(summary):
+    print(f"\nRequests: {summary['requests']} in {summary['wall_seconds']}s")
+    print(f"Throughput: {summary['throughput']} responses/s "
+          f"({summary['success_throughput']} successful cards/s)")
+    print(f"HTTP statuses: {summary['statuses']}  (success rate {summary['success_rate']:.2%})")
+    print(f"Transport errors: {summary['transport_errors'] or 'none'}")
+    for key, value in summary["latency_ms"].items():
+        print(f"{key.upper():<4}: {value:.0f}ms" if value is not None else f"{key.upper():<4}: -")
+
+    print("\nLatency histogram (all responses):")
+    peak = max(summary["histogram_ms"].values(), default=0) or 1
+    for label, count in summary["histogram_ms"].items():
+        print(f"{label:>14} | {'#' * int(40 * count / peak):<40} {count}")
+
+
+def start_local_server(dedup=False):
+    """Serve app.py on a free localhost port in a background thread.
+
+    Uploads, JSON output and the duplicate index go to a temporary directory,
+    so load tests never touch the real uploads/, output/ or pan_hashes.db.
+    """
+    from werkzeug.serving import make_server
+    import app as pan_app
+
+    # The app builds its processors and index on first use, after this config
+    workdir = tempfile.mkdtemp(prefix="pan_loadtest_")
+    pan_app.app.config['UPLOAD_FOLDER'] = os.path.join(workdir, "uploads")
+    pan_app.app.config['OUTPUT_FOLDER'] = os.path.join(workdir, "output")
+    pan_app.app.config['HASH_INDEX'] = os.path.join(workdir, "pan_hashes.db")
+    pan_app.app.config['DEDUP'] = dedup
+    pan_app.get_processors()
+    print(f"Local server files: {workdir}")
+
+    server = make_server("127.0.0.1", 0, pan_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/process"
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for the Flask PAN service")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=4, help="closed-loop concurrent clients")
+    mode.add_argument("--rate", type=float, help="open-loop arrival rate in cards per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to generate load")
+    parser.add_argument("--cards", type=int, default=50, help="number of distinct synthetic cards")
+    parser.add_argument("--images", help="directory of real card images to replay instead")
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--dedup", action="store_true",
+                        help="enable the duplicate index on the local server; cards are replayed, so from the "
+                             "second pass on complete cards are answered from the index without detection or OCR")
+    parser.add_argument("--output", help="results JSON file (default: loadtest_results/<commit>_<time>.json)")
+    args = parser.parse_args()
+
+    if args.images:
+        cards = []
+        for name in sorted(os.listdir(args.images)):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                with open(os.path.join(args.images, name), "rb") as f:
+                    cards.append(f.read())
+    else:
+        print("⚠️ Synthetic cards have no real PAN layout, so the detector will usually miss fields and "
+              "most responses will be 400 without OCR. Use --images with real cards for representative numbers.")
+        cards = [synthetic_card(seed) for seed in range(args.cards)]
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_local_server(args.dedup)
+    print(f"Target: {url}")
+
+    generator = LoadGenerator(url, cards)
+    start = time.perf_counter()
+    if args.rate:
+        print(f"Open loop: {args.rate} cards/s for {args.duration}s")
+        generator.open_loop(args.rate, args.duration)
+    else:
+        print(f"Closed loop: {args.concurrency} clients for {args.duration}s")
+        generator.closed_loop(args.concurrency, args.duration)
+    wall = time.perf_counter() - start
+
+    if server is not None:
+        server.shutdown()
+
+    summary = summarize(generator.results, wall)
+    print_report(summary)
+
+    commit = current_commit()
+    output = args.output or os.path.join(
+        "loadtest_results", f"{commit}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    )
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "config": {
+                "mode": "open" if args.rate else "closed",
+                "concurrency": None if args.rate else args.concurrency,
+                "rate": args.rate,
+                "duration": args.duration,
+                "cards": len(cards),
+                "card_source": "images" if args.images else "synthetic",
+                "dedup": None if args.url else args.dedup,
+            },
+            "summary": summary,
+        }, f, indent=4)
+    print(f"\n✅ Results saved to: {output}")
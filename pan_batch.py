@@ -0,0 +1,189 @@
+# pan_batch.py
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Statuses that are not retried when a batch is resumed
+DONE_STATUSES = {"saved", "missing"}
+
+# Images processed serially at the start of a parallel batch to measure the speedup against
+SERIAL_SAMPLE = 3
+
+_worker_processor = None
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BatchManifest:
+    """Append-only JSON-lines record of processed files, keyed by content hash.
+
+    Entries are buffered by record() and only written by commit(), so callers
+    can commit right after their output is safely on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.pending = []
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partial line from an interrupted write
+                    self.entries[entry["hash"]] = entry
+
+    def is_done(self, file_hash):
+        entry = self.entries.get(file_hash)
+        return entry is not None and entry["status"] in DONE_STATUSES
+
+    def record(self, file_hash, path, status, **info):
+        entry = {
+            "hash": file_hash,
+            "path": path,
+            "status": status,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            **info
+        }
+        self.entries[file_hash] = entry
+        self.pending.append(entry)
+
+    def reconcile(self, saved_hashes):
+        """Match "saved" entries to the records actually present in the output.
+
+        Hashes in the output but not marked done (a crash between saving and
+        commit) are recorded as saved. "saved" entries whose record is no
+        longer in the output (a deleted or replaced file) are recorded as
+        "lost", so they are processed again.
+        """
+        saved_hashes = set(saved_hashes)
+        for file_hash in saved_hashes:
+            if not self.is_done(file_hash):
+                self.record(file_hash, None, "saved", recovered=True)
+        lost = [(h, entry["path"]) for h, entry in self.entries.items()
+                if entry["status"] == "saved" and h not in saved_hashes]
+        for file_hash, path in lost:
+            self.record(file_hash, path, "lost")
+        self.commit()
+        return len(lost)
+
+    def commit(self):
+        """Durably append all pending entries"""
+        if not self.pending:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            for entry in self.pending:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = []
+
+
+def _init_worker(processor_cls, workers):
+    from pan_cpu import CPUBudget
+
+    global _worker_processor
+    _worker_processor = processor_cls(cpu_budget=CPUBudget(workers=workers))
+
+
+def _timed(processor, image_path):
+    start = time.perf_counter()
+    data, missing = processor.process_image(image_path)
+    return data, missing, time.perf_counter() - start
+
+
+def _process_one(image_path):
+    return _timed(_worker_processor, image_path)
+
+
+class BatchTiming:
+    """Wall time of a batch, compared with a serial baseline for parallel runs"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.start = time.perf_counter()
+        self.serial_times = []
+        self.pool_start = None
+        self.pool_count = 0
+
+    def report(self):
+        count = len(self.serial_times) + self.pool_count
+        if not count:
+            return
+        end = time.perf_counter()
+        wall = end - self.start
+        print(f"⏱️ Wall time: {wall:.1f}s for {count} images with {self.workers} worker(s) "
+              f"({count / wall:.2f} images/s)")
+        if not (self.serial_times and self.pool_count):
+            return
+        serial = sum(self.serial_times) / len(self.serial_times)
+        pool_wall = end - self.pool_start
+        print(f"   Serial baseline: {serial:.2f}s per image over the first {len(self.serial_times)} images. "
+              f"The pool then took {pool_wall:.1f}s for {self.pool_count} images, "
+              f"{serial * self.pool_count / pool_wall:.1f}x faster than serial")
+
+
+def run_batch(processor, image_paths, manifest, workers=1, timing=None, serial_sample=SERIAL_SAMPLE):
+    """Process images not yet in the manifest and yield results in input order.
+
+    Yields (index, image_path, file_hash, data, missing, elapsed) where index
+    is the 1-based position in image_paths. With workers > 1 images are
+    processed by a process pool, each process loading its own model, while
+    results still come back in input order to the single caller. The first
+    serial_sample images are processed serially beforehand and recorded in
+    timing as the baseline for the speedup.
+    """
+    todo = []
+    seen = set()
+    for idx, image_path in enumerate(image_paths, 1):
+        try:
+            h = file_hash(image_path)
+        except OSError as e:
+            print(f"Could not read file {image_path}: {str(e)}")
+            continue
+        if manifest.is_done(h) or h in seen:
+            continue
+        seen.add(h)
+        todo.append((idx, image_path, h))
+
+    skipped = len(image_paths) - len(todo)
+    if skipped:
+        print(f"Skipping {skipped} already processed or duplicate files")
+
+    if workers <= 1:
+        serial_sample = len(todo)
+    for idx, image_path, h in todo[:serial_sample]:
+        data, missing, elapsed = _timed(processor, image_path)
+        if timing is not None:
+            timing.serial_times.append(elapsed)
+        yield idx, image_path, h, data, missing, elapsed
+
+    todo = todo[serial_sample:]
+    if not todo:
+        return
+    if timing is not None:
+        timing.pool_start = time.perf_counter()
+    paths = [image_path for _, image_path, _ in todo]
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(type(processor), workers))
+    try:
+        for (idx, image_path, h), (data, missing, elapsed) in zip(todo, executor.map(_process_one, paths)):
+            if timing is not None:
+                timing.pool_count += 1
+            yield idx, image_path, h, data, missing, elapsed
+    finally:
+        # Don't wait for queued images if the caller stops early or crashes
+        executor.shutdown(cancel_futures=True)
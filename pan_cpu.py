@@ -0,0 +1,51 @@
+# pan_cpu.py
+import os
+import cv2
+import torch
+
+
+class CPUBudget:
+    """Split the machine's cores between concurrent workers.
+
+    torch, OpenCV and Tesseract each default to a thread per core, so
+    running several process_image calls at once oversubscribes the CPU.
+    The budget gives every library cores // workers threads instead.
+    """
+
+    def __init__(self, workers=1, cores=None, threads=None):
+        self.workers = max(1, workers)
+        self.cores = cores or os.cpu_count() or 1
+        self.threads = threads or max(1, self.cores // self.workers)
+        self.applied = False
+
+    def apply(self):
+        """Set thread counts for torch, OpenCV and Tesseract.
+
+        The settings are process-wide, so processors sharing a budget only
+        need it applied once. torch's inter-op pool can only be sized once
+        per process; later budgets keep the first count, as settings() shows.
+        """
+        torch.set_num_threads(self.threads)
+        try:
+            torch.set_num_interop_threads(self.threads)
+        except RuntimeError:
+            pass
+        cv2.setNumThreads(self.threads)
+        # Read by each Tesseract process that pytesseract starts
+        os.environ["OMP_THREAD_LIMIT"] = str(self.threads)
+        self.applied = True
+        return self.settings()
+
+    def settings(self):
+        """Report the thread counts that are actually in effect"""
+        return {
+            "cores": self.cores,
+            "workers": self.workers,
+            "torch_threads": torch.get_num_threads(),
+            "torch_interop_threads": torch.get_num_interop_threads(),
+            "opencv_threads": cv2.getNumThreads(),
+            "tesseract_threads": os.environ.get("OMP_THREAD_LIMIT", "default"),
+        }
+
+    def __str__(self):
+        return ", ".join(f"{key}={value}" for key, value in self.settings().items())
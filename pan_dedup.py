@@ -0,0 +1,206 @@
+# pan_dedup.py
+import sqlite3
+import threading
+import json
+import os
+from datetime import datetime
+
+
+def dhash(image, hash_size=16):
+    """Difference hash of an image as a (hash_size * hash_size)-bit integer"""
+    # Imported here so the index itself works without OpenCV
+    import cv2
+    import numpy as np
+
+    if image is None or image.size == 0:
+        return None
+    if len(image.shape) == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    resized = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = resized[:, 1:] > resized[:, :-1]
+    return int.from_bytes(np.packbits(diff.flatten()).tobytes(), "big")
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+class PerceptualIndex:
+    """Persistent near-duplicate index using multi-index hashing over SQLite.
+
+    Each hash is split into `chunks` equal bit slices stored in an indexed
+    table. By the pigeonhole principle two hashes within Hamming distance
+    `threshold` < `chunks` share at least one identical slice, so a lookup only
+    has to compare the few entries that collide on some slice.
+
+    PAN cards share one template, so slices covering its fixed parts hold the
+    same value for most cards. Slice values stored more than `max_bucket`
+    times are skipped on lookup, which keeps lookups from scanning the whole
+    index. The guarantee then holds as long as more than `threshold` of the
+    query's slices are below the cap; otherwise a near-duplicate may be
+    missed, but a match is never reported above the threshold.
+    """
+
+    def __init__(self, db_path="pan_hashes.db", threshold=10, hash_size=16, chunks=16, max_bucket=256):
+        bits = hash_size * hash_size
+        if bits % chunks:
+            raise ValueError(f"{bits}-bit hash cannot be split into {chunks} chunks")
+        if not 0 <= threshold < chunks:
+            raise ValueError(f"threshold must be between 0 and {chunks - 1}")
+        self.db_path = db_path
+        self.threshold = threshold
+        self.hash_size = hash_size
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self.max_bucket = max_bucket
+        self._lock = threading.Lock()
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        """Create tables and check the stored hash layout matches"""
+        with self._lock, self.conn:
+            self.conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    source TEXT,
+                    record TEXT NOT NULL,
+                    created TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS hash_chunks (
+                    chunk INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    entry_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_chunk_value ON hash_chunks (chunk, value);
+                CREATE TABLE IF NOT EXISTS chunk_counts (
+                    chunk INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (chunk, value)
+                );
+                CREATE TABLE IF NOT EXISTS review_flags (
+                    id INTEGER PRIMARY KEY,
+                    entry_id INTEGER NOT NULL,
+                    source TEXT,
+                    distance INTEGER NOT NULL,
+                    created TEXT NOT NULL
+                );
+            """)
+            layout = f"{self.hash_size}x{self.chunks}"
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+            if row is None:
+                self.conn.execute("INSERT INTO meta VALUES ('layout', ?)", (layout,))
+            elif row[0] != layout:
+                raise ValueError(f"Index {self.db_path} uses layout {row[0]}, not {layout}")
+            # Indexes created before chunk_counts existed
+            if self.conn.execute("SELECT 1 FROM chunk_counts LIMIT 1").fetchone() is None:
+                self.conn.execute(
+                    "INSERT INTO chunk_counts SELECT chunk, value, COUNT(*) FROM hash_chunks GROUP BY chunk, value"
+                )
+
+    def _split(self, h):
+        """Split a hash into its chunk values"""
+        mask = (1 << self.chunk_bits) - 1
+        return [(h >> (i * self.chunk_bits)) & mask for i in range(self.chunks)]
+
+    def hash_image(self, image):
+        """Compute the index hash for a decoded image"""
+        return dhash(image, self.hash_size)
+
+    def _candidates(self, h):
+        """Ids and hashes of entries sharing a slice value that is not too common"""
+        pairs = list(enumerate(self._split(h)))
+        clause = " OR ".join(["(chunk = ? AND value = ?)"] * len(pairs))
+        params = [v for pair in pairs for v in pair]
+        with self._lock:
+            common = set(self.conn.execute(
+                f"SELECT chunk, value FROM chunk_counts WHERE count > ? AND ({clause})",
+                [self.max_bucket] + params
+            ).fetchall())
+            pairs = [pair for pair in pairs if pair not in common]
+            if not pairs:
+                return []
+            clause = " OR ".join(["(c.chunk = ? AND c.value = ?)"] * len(pairs))
+            params = [v for pair in pairs for v in pair]
+            return self.conn.execute(
+                "SELECT DISTINCT e.id, e.hash FROM hash_chunks c "
+                f"JOIN entries e ON e.id = c.entry_id WHERE {clause}", params
+            ).fetchall()
+
+    def lookup(self, h):
+        """Return the closest stored entry within the threshold, or None"""
+        if h is None:
+            return None
+
+        best_id, best_distance = None, None
+        for entry_id, stored in self._candidates(h):
+            distance = hamming(h, int(stored, 16))
+            if distance <= self.threshold and (best_id is None or distance < best_distance):
+                best_id, best_distance = entry_id, distance
+        if best_id is None:
+            return None
+
+        # Only the best match needs its record decoded
+        with self._lock:
+            source, record = self.conn.execute(
+                "SELECT source, record FROM entries WHERE id = ?", (best_id,)
+            ).fetchone()
+        return {"id": best_id, "source": source, "distance": best_distance, "record": json.loads(record)}
+
+    def add(self, h, record, source=None):
+        """Store a processed record under its hash and return the entry id"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO entries (hash, source, record, created) VALUES (?, ?, ?, ?)",
+                (format(h, "x"), source, json.dumps(record), now)
+            )
+            entry_id = cur.lastrowid
+            parts = list(enumerate(self._split(h)))
+            self.conn.executemany(
+                "INSERT INTO hash_chunks (chunk, value, entry_id) VALUES (?, ?, ?)",
+                [(i, value, entry_id) for i, value in parts]
+            )
+            self.conn.executemany(
+                "INSERT INTO chunk_counts (chunk, value, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (chunk, value) DO UPDATE SET count = count + 1",
+                parts
+            )
+        return entry_id
+
+    def flag(self, match, source=None):
+        """Record a near-duplicate hit for fraud review"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO review_flags (entry_id, source, distance, created) VALUES (?, ?, ?, ?)",
+                (match["id"], source, match["distance"], now)
+            )
+
+    def review_flags(self):
+        """List flagged near-duplicates with the entry they matched"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT f.source, e.source, f.distance, f.created FROM review_flags f "
+                "JOIN entries e ON e.id = f.entry_id ORDER BY f.id"
+            ).fetchall()
+        return [
+            {"source": src, "matched_source": matched, "distance": dist, "created": created}
+            for src, matched, dist, created in rows
+        ]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
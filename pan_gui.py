@@ -2,22 +2,46 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import customtkinter as ctk
 from pan_json import PANProcessor
+from pan_cpu import CPUBudget
 import threading
+import queue
 import os
+import glob
+from concurrent.futures import ThreadPoolExecutor
 from tkinterdnd2 import DND_FILES, TkinterDnD
-import time
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
+
+STAGE_TEXT = {
+    "read": "Reading image",
+    "duplicate_check": "Checking duplicates",
+    "detect": "Detecting fields",
+    "ocr": "Reading text",
+    "duplicate": "Duplicate found",
+    "done": "Finishing",
+}
+
 
 class PANApp(ctk.CTk, TkinterDnD.DnDWrapper):
-    def __init__(self):
+    def __init__(self, workers=None):
         super().__init__()
         self.TkinterDnDVersion = TkinterDnD._require(self)
-        self.processor = PANProcessor()
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.cpu_budget = CPUBudget(workers=self.workers)
+        # Processors are kept for the life of the app, one per busy worker,
+        # since the model is not thread-safe and slow to load
+        self.processors = queue.Queue()
+        self.processors.put(PANProcessor(cpu_budget=self.cpu_budget))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
         self.title("PAN Card Information Extractor")
         self.geometry("800x600")
         self.configure_appearance()
         self.create_initial_ui()
         self.setup_drag_drop()
         self.progress_running = False
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def configure_appearance(self):
         ctk.set_appearance_mode("System")
@@ -43,7 +67,7 @@ class PANApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.drop_frame.pack(fill='x', padx=20, pady=10)
         
         self.drop_content = ctk.CTkLabel(self.drop_frame,
-                                       text="Drag & Drop PAN Card Image Here",
+                                       text="Drag & Drop PAN Card Images or Folders Here",
                                        text_color=("gray50", "gray40"),
                                        font=("Arial", 14, "bold"),
                                        compound='top',
@@ -83,10 +107,17 @@ class PANApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.spinner_label = ctk.CTkLabel(self.processing_frame, text="Loading...")
         self.spinner_label.pack(pady=10)  
         
+        # Cancel button
+        self.cancel_btn = ctk.CTkButton(self.processing_frame,
+                                        text="Cancel",
+                                        fg_color="#ff5555",
+                                        command=self.cancel_processing)
+        self.cancel_btn.pack(pady=5)
+
         # Results Display
-        self.result_frame = ctk.CTkFrame(self.processing_frame, 
-                                         height=300,
-                                         corner_radius=10)
+        self.result_frame = ctk.CTkScrollableFrame(self.processing_frame,
+                                                   height=300,
+                                                   corner_radius=10)
         self.result_frame.pack(fill='both', expand=True, padx=20, pady=20)
 
     def setup_drag_drop(self):
@@ -102,68 +133,218 @@ class PANApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.drop_frame.configure(border_color="#3B8ED0")
 
     def handle_drop(self, event):
-        files = event.data
-        if files:
-            file_path = files.strip("{}")  # Remove curly braces from Windows paths
-            if os.path.isfile(file_path):
-                self.start_processing(file_path)
+        if not event.data:
+            return
+        # splitlist handles the curly braces around Windows paths with spaces
+        file_paths = self.collect_images(self.tk.splitlist(event.data))
+        if not file_paths:
+            return
+        if self.progress_running:
+            self.add_files(file_paths)
+        else:
+            self.start_processing(file_paths)
 
     def browse_files(self):
         filetypes = (("Image files", "*.jpg *.jpeg *.png *.bmp *.tiff"),
                    ("PDF files", "*.pdf"),
                    ("All files", "*.*"))
-        file_path = filedialog.askopenfilename(filetypes=filetypes)
-        if file_path and os.path.isfile(file_path):
-            self.start_processing(file_path)
+        file_paths = self.collect_images(filedialog.askopenfilenames(filetypes=filetypes))
+        if not file_paths:
+            return
+        if self.progress_running:
+            self.add_files(file_paths)
+        else:
+            self.start_processing(file_paths)
 
-    def start_processing(self, file_path):
+    def collect_images(self, paths):
+        """Expand dropped files and folders into a list of image paths"""
+        file_paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                file_paths.extend(sorted(
+                    p for p in glob.glob(os.path.join(path, "*"))
+                    if p.lower().endswith(IMAGE_EXTENSIONS)
+                ))
+            elif os.path.isfile(path):
+                file_paths.append(path)
+        return file_paths
+
+    def start_processing(self, file_paths):
         # Switch to processing UI
         self.main_frame.pack_forget()
         self.create_processing_ui()
         self.processing_frame.pack(pady=40, padx=40, fill='both', expand=True)
         
-        # Show file info
-        self.file_label.configure(text=f"Processing: {os.path.basename(file_path)}")
+        self.file_paths = []
+        self.file_progress = []
+        self.file_status = {}
+        self.futures = []
+        self.finished = 0
+        self.results = {}
         
         # Start processing
         self.progress_running = True
-        threading.Thread(target=self.animate_spinner).start()
-        threading.Thread(target=self.run_processing, args=(file_path,)).start()
+        self.cancel_event = threading.Event()
+        self.add_files(file_paths)
+        self.animate_spinner(0)
+        self.poll_events()
+
+    def add_files(self, file_paths):
+        """Queue files on the worker pool, including while a batch is running"""
+        for file_path in file_paths:
+            idx = len(self.file_paths)
+            self.file_paths.append(file_path)
+            self.file_progress.append(0.0)
+            self.futures.append(self.executor.submit(self.run_processing, idx, file_path, self.cancel_event))
+
+        # Show file info, with one status row per queued file once there is more than one
+        if len(self.file_paths) == 1:
+            self.file_label.configure(text=f"Processing: {os.path.basename(self.file_paths[0])}")
+            return
+        self.file_label.configure(text=f"Processing {len(self.file_paths)} files")
+        for idx, file_path in enumerate(self.file_paths):
+            if idx not in self.file_status:
+                self.add_status_row(idx, file_path)
+
+    def add_status_row(self, idx, file_path):
+        row = ctk.CTkFrame(self.result_frame)
+        row.pack(fill='x', pady=2, padx=5)
+        ctk.CTkLabel(row,
+                     text=os.path.basename(file_path),
+                     width=300,
+                     anchor='w',
+                     font=("Arial", 12)).pack(side='left', padx=5)
+        status = ctk.CTkLabel(row, text="Queued", anchor='w', font=("Arial", 12))
+        status.pack(side='left', fill='x', expand=True)
+        self.file_status[idx] = status
 
-    def animate_spinner(self):
+    def cancel_processing(self):
+        """Drop queued files and stop the ones in progress"""
+        self.cancel_event.set()
+        for idx, future in enumerate(self.futures):
+            if future.cancel():
+                self.events.put(("cancelled", idx, None))
+        self.cancel_btn.configure(state='disabled', text="Cancelling...")
+
+    def animate_spinner(self, frame):
         spinner_frames = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
-        frame = 0
-        while self.progress_running:
-            self.spinner_label.configure(text=spinner_frames[frame])
-            frame = (frame + 1) % len(spinner_frames)
-            time.sleep(0.1)
-            self.update_idletasks()
-
-    def run_processing(self, file_path):
+        if not self.progress_running:
+            return
+        self.spinner_label.configure(text=spinner_frames[frame])
+        self.after(100, self.animate_spinner, (frame + 1) % len(spinner_frames))
+
+    def run_processing(self, idx, file_path, cancel_event):
+        """Runs on a worker thread; all UI updates go through the event queue"""
+        if cancel_event.is_set():
+            self.events.put(("cancelled", idx, None))
+            return
         try:
-            # Simulated progress updates
-            for i in range(101):
-                if not self.progress_running:
-                    break
-                self.progress_bar.set(i / 100)
-                self.progress_label.configure(text=f"{i}%")
-                time.sleep(0.03)
-            
-            # Actual processing
-            data, missing = self.processor.process_image(file_path)
+            # At most `workers` tasks run at once, so at most that many processors are created
+            try:
+                processor = self.processors.get_nowait()
+            except queue.Empty:
+                processor = PANProcessor(cpu_budget=self.cpu_budget)
+        except Exception as e:
+            self.events.put(("failed", idx, str(e)))
+            return
+        try:
+            data, missing = processor.process_image(
+                file_path,
+                progress=lambda event: self.events.put(("progress", idx, event)),
+                cancel_event=cancel_event
+            )
             
-            if missing:
-                self.show_error(missing)
+            if cancel_event.is_set():
+                self.events.put(("cancelled", idx, None))
+            elif missing:
+                self.events.put(("missing", idx, missing))
             else:
                 filename = os.path.splitext(os.path.basename(file_path))[0]
-                saved_path = self.processor.save_to_json(data, filename)
-                self.show_results(saved_path, data)  # Pass both saved_path and data correctly
+                saved_path = processor.save_to_json(data, filename)
+                self.events.put(("saved", idx, (saved_path, data)))
                 
         except Exception as e:
-            messagebox.showerror("Error", f"Processing failed: {str(e)}")
+            self.events.put(("failed", idx, str(e)))
         finally:
-            self.progress_running = False
-            self.spinner_label.configure(text="")  # Stop spinner
+            self.processors.put(processor)
+
+    def poll_events(self):
+        """Apply worker updates on the Tk thread"""
+        try:
+            while True:
+                kind, idx, payload = self.events.get_nowait()
+                self.handle_event(kind, idx, payload)
+        except queue.Empty:
+            pass
+
+        if self.finished < len(self.file_paths):
+            self.after(50, self.poll_events)
+        else:
+            self.finish_processing()
+
+    def handle_event(self, kind, idx, payload):
+        if kind == "progress":
+            self.file_progress[idx] = payload["progress"]
+            status = STAGE_TEXT.get(payload["stage"], payload["stage"])
+            if payload["stage"] == "ocr":
+                status += f" ({int(payload['progress'] * 100)}%)"
+            self.set_status(idx, status)
+        else:
+            self.file_progress[idx] = 1.0
+            self.finished += 1
+            self.results[idx] = (kind, payload)
+            if kind == "saved":
+                self.set_status(idx, "✓ Saved", "green")
+            elif kind == "missing":
+                self.set_status(idx, f"Missing: {', '.join(payload)}", "#ff5555")
+            elif kind == "failed":
+                self.set_status(idx, f"Failed: {payload}", "#ff5555")
+            else:
+                self.set_status(idx, "Cancelled", ("gray50", "gray40"))
+
+        fraction = sum(self.file_progress) / len(self.file_progress)
+        self.progress_bar.set(fraction)
+        self.progress_label.configure(
+            text=f"{int(fraction * 100)}%  ({self.finished}/{len(self.file_paths)} files)"
+        )
+
+    def set_status(self, idx, text, color=None):
+        status = self.file_status.get(idx)
+        if status is None:
+            return
+        status.configure(text=text)
+        if color:
+            status.configure(text_color=color)
+
+    def finish_processing(self):
+        self.progress_running = False
+        self.spinner_label.configure(text="")  # Stop spinner
+        self.cancel_btn.pack_forget()
+
+        if len(self.file_paths) > 1:
+            self.show_summary()
+            return
+
+        kind, payload = self.results[0]
+        if kind == "saved":
+            saved_path, data = payload
+            self.show_results(saved_path, data)
+        elif kind == "missing":
+            self.show_error(payload)
+        elif kind == "failed":
+            self.show_error([], f"Processing failed:\n{payload}")
+        else:
+            self.show_error([], "Processing cancelled.")
+
+    def show_summary(self):
+        self.spinner_label.pack_forget()
+        saved = sum(1 for kind, _ in self.results.values() if kind == "saved")
+        self.file_label.configure(text=f"Processed {saved}/{len(self.file_paths)} files successfully")
+
+        try_again_btn = ctk.CTkButton(self.result_frame,
+                                      text="Process More",
+                                      command=self.reset_to_initial_ui)
+        try_again_btn.pack(pady=20)
 
     def show_results(self, saved_path, data):
         self.spinner_label.pack_forget()
@@ -212,12 +393,13 @@ class PANApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.processing_frame.pack_forget()
         self.create_initial_ui()
 
-    def show_error(self, missing):
+    def show_error(self, missing, error_text=None):
         self.spinner_label.pack_forget()
         
-        error_text = f"Missing fields detected:\n{', '.join(missing)}"
-        if len(missing) >= 2:
-            error_text += "\n\n⚠️ Please try again with a clearer image!"
+        if error_text is None:
+            error_text = f"Missing fields detected:\n{', '.join(missing)}"
+            if len(missing) >= 2:
+                error_text += "\n\n⚠️ Please try again with a clearer image!"
             
         error_label = ctk.CTkLabel(self.result_frame, 
                                  text=error_text, 
@@ -231,6 +413,12 @@ class PANApp(ctk.CTk, TkinterDnD.DnDWrapper):
                                       command=self.reset_to_initial_ui)
         try_again_btn.pack(pady=20)
 
+    def on_close(self):
+        if self.progress_running:
+            self.cancel_processing()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
 if __name__ == "__main__":
     app = PANApp()
     app.mainloop()
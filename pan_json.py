@@ -2,31 +2,28 @@ import cv2
 import numpy as np
 import pytesseract
 from ultralytics import YOLO
-import re
-from datetime import datetime
+from pan_parse import parse_dob, parse_pan, parse_name
+from pan_batch import BatchManifest, BatchTiming, run_batch
 import os
 import glob
 import json
 import time
 
 class PANProcessor:
-    def __init__(self):
+    def __init__(self, dedup_index=None, cpu_budget=None):
         self.class_map = {
             0: "dob",
             1: "father_name",
             2: "name",
             3: "pan_number"
         }
-        self.date_formats = [
-            (r'(\d{1,2})[/\-\.\s](\d{1,2})[/\-\.\s](\d{4})', 'dmy'),
-            (r'(\d{4})[/\-\.\s](\d{1,2})[/\-\.\s](\d{1,2})', 'ymd'),
-            (r'(\d{1,2})[/\-\.\s]([A-Za-z]{3,})[/\-\.\s](\d{4})', 'dby'),
-        ]
-        self.month_map = {
-            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-        }
+        self.cpu_budget = cpu_budget
+        # Processors sharing a budget apply it once for the process
+        if cpu_budget is not None and not cpu_budget.applied:
+            cpu_budget.apply()
+            print(f"CPU budget: {cpu_budget}")
         self.model = YOLO("best.pt")
+        self.dedup_index = dedup_index
         pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
     def preprocess(self, image):
@@ -42,96 +39,64 @@ class PANProcessor:
         except cv2.error:
             return None
 
-    def _validate_date(self, day, month, year):
-        """Check if date components form valid date"""
-        try:
-            if 1900 <= year <= datetime.now().year + 10:
-                datetime(year=year, month=month, day=day)
-                return True
-        except ValueError:
-            return False
-        return False
-
     def _process_dob(self, text):
-        """Robust date parsing with multiple format support"""
-        text = text.replace('O', '0').replace('o', '0').replace('l', '1')
-        text = re.sub(r'[^0-9/\-\.\sA-Za-z]', '', text)
-        
-        # Handle 8-digit date format
-        digits_only = re.sub(r'\D', '', text)
-        if len(digits_only) == 8:
-            day = int(digits_only[:2])
-            month = int(digits_only[2:4])
-            year = int(digits_only[4:8])
-            if self._validate_date(day, month, year):
-                return f"{day:02d}/{month:02d}/{year}"
-            
-            month = int(digits_only[:2])
-            day = int(digits_only[2:4])
-            if self._validate_date(day, month, year):
-                return f"{day:02d}/{month:02d}/{year}"
-        
-        for pattern, fmt in self.date_formats:
-            match = re.search(pattern, text)
-            if match:
-                try:
-                    if fmt == 'dmy':
-                        day, month, year = map(int, match.groups())
-                    elif fmt == 'ymd':
-                        year, month, day = map(int, match.groups())
-                    elif fmt == 'dby':
-                        day = int(match.group(1))
-                        month_str = match.group(2)[:3].lower()
-                        month = self.month_map.get(month_str, 0)
-                        year = int(match.group(3))
-                    
-                    if self._validate_date(day, month, year):
-                        return f"{day:02d}/{month:02d}/{year}"
-                except (ValueError, KeyError):
-                    continue
-        
-        return ""
+        """Parse date of birth via the shared field parser"""
+        return parse_dob(text)
 
     def _process_pan(self, text):
-        """Robust PAN validation with OCR correction"""
-        CHAR_MAP = {'0':'O','1':'I','2':'Z','4':'A','5':'S','8':'B',
-                   'B':'8','D':'0','I':'1','O':'0','S':'5','Z':'2'}
-        cleaned = re.sub(r'[^A-Z0-9]', '', text.upper())
-        if len(cleaned) != 10:
-            return ""
-        
-        parts = [
-            [c if c.isalpha() else CHAR_MAP.get(c, c) for c in cleaned[:5]],
-            [c if c.isdigit() else CHAR_MAP.get(c, c) for c in cleaned[5:9]],
-            [CHAR_MAP.get(cleaned[9], '') if not cleaned[9].isalpha() else cleaned[9]]
-        ]
-        
-        pan = ''.join([''.join(p) for p in parts])
-        if re.match(r'^[A-Z]{5}[0-9]{4}[A-Z]$', pan):
-            return pan
-        return ""
+        """Validate PAN number via the shared field parser"""
+        return parse_pan(text)
 
     def _process_name(self, text):
-        """Validate names with OCR correction"""
-        text = re.sub(r'[^A-Za-z\s\']', '', text)
-        if re.fullmatch(r'^[Oo]+$', text.strip()):
-            return ""
-        text = re.sub(r'\s+', ' ', text).strip().title()
-        return text if len(text) >= 2 and not any(c.isdigit() for c in text) else ""
-
-    def process_image(self, image_path):
-        """Process single image and return extracted data with missing fields"""
+        """Validate names via the shared field parser"""
+        return parse_name(text)
+
+    def _report(self, progress, stage, fraction, **extra):
+        """Send a pipeline stage update to the progress callback, if any"""
+        if progress is not None:
+            progress({"stage": stage, "progress": fraction, **extra})
+
+    def process_image(self, image_path, progress=None, cancel_event=None):
+        """Process single image and return extracted data with missing fields
+
+        progress is called with a dict holding the finished "stage" and the
+        overall "progress" fraction; "ocr" updates also carry the "field" and
+        its parsed "value". Setting cancel_event stops processing between
+        stages.
+        """
         try:
             img = cv2.imread(image_path)
             if img is None:
                 print(f"Could not read image: {image_path}")
                 return {}, list(self.class_map.values())
+            self._report(progress, "read", 0.05)
+
+            # Near-duplicate check before running detection
+            image_hash = None
+            if self.dedup_index is not None:
+                image_hash = self.dedup_index.hash_image(img)
+                match = self.dedup_index.lookup(image_hash)
+                if match:
+                    self.dedup_index.flag(match, source=image_path)
+                    print(f"⚠️ Near-duplicate of {match['source']} (distance {match['distance']}), flagged for review")
+                    missing = [field for field, value in match["record"].items() if not value]
+                    record = {**match["record"], "duplicate_of": match["source"], "distance": match["distance"]}
+                    self._report(progress, "duplicate", 1.0)
+                    return record, missing
+                self._report(progress, "duplicate_check", 0.1)
+
+            if cancel_event is not None and cancel_event.is_set():
+                return {}, list(self.class_map.values())
             
             results = self.model(img)[0]
             extracted = {v: "" for v in self.class_map.values()}
             pan_candidates = []
+            box_count = len(results.obb.cls)
+            self._report(progress, "detect", 0.4)
 
-            for box, cls in zip(results.obb.xyxyxyxy, results.obb.cls):
+            for idx, (box, cls) in enumerate(zip(results.obb.xyxyxyxy, results.obb.cls), 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    return {}, list(self.class_map.values())
                 corners = box.cpu().numpy().reshape(4, 2).astype(np.float32)
                 class_name = self.class_map[int(cls)]
                 
@@ -168,10 +133,13 @@ class PANProcessor:
                 if class_name == "pan_number":
                     if pan := self._process_pan(text):
                         pan_candidates.append(pan)
+                    value = pan
                 elif class_name == "dob":
-                    extracted[class_name] = self._process_dob(text)
+                    value = extracted[class_name] = self._process_dob(text)
                 else:
-                    extracted[class_name] = self._process_name(text)
+                    value = extracted[class_name] = self._process_name(text)
+                self._report(progress, "ocr", 0.4 + 0.55 * idx / box_count,
+                             field=class_name, value=value)
 
             valid_pans = [p for p in pan_candidates if p]
             if valid_pans:
@@ -180,27 +148,43 @@ class PANProcessor:
                 extracted["pan_number"] = pan_candidates[0]
 
             missing = [field for field, value in extracted.items() if not value]
+            if self.dedup_index is not None and not missing:
+                self.dedup_index.add(image_hash, extracted, source=image_path)
+            self._report(progress, "done", 1.0)
             return extracted, missing
     
         except Exception as e:
             print(f"Error processing {image_path}: {str(e)}")
             return {}, list(self.class_map.values())
 
-    def process_batch(self, image_paths):
-        """Process multiple images and save to JSON files"""
+    def process_batch(self, image_paths, workers=1, manifest_file=os.path.join("output", "batch_manifest.jsonl")):
+        """Process multiple images and save to JSON files
+
+        Processed files are recorded in a manifest by content hash, so an
+        interrupted run resumes with the first unprocessed image. Output files
+        are named after that hash, so an image processed again after a crash
+        overwrites its earlier file instead of adding another.
+        """
         success_count = 0
+        processed = 0
         total_files = len(image_paths)
+        manifest = BatchManifest(manifest_file)
+        # Images whose JSON file has since been deleted are processed again
+        manifest.reconcile(h for h, entry in manifest.entries.items()
+                           if entry["status"] == "saved" and os.path.exists(entry.get("output") or ""))
+        timing = BatchTiming(workers)
         
         print(f"\nStarting processing of {total_files} files...")
         
-        for idx, img_path in enumerate(image_paths, 1):
-            print(f"\nProcessing file {idx}/{total_files}")
+        for idx, img_path, file_hash, data, missing, elapsed in run_batch(self, image_paths, manifest, workers, timing):
+            print(f"\nProcessed file {idx}/{total_files}")
             print(f"File: {os.path.basename(img_path)}")
-            
-            data, missing = self.process_image(img_path)
+            processed += 1
             
             if not data:
                 print("🛑 Failed to process file")
+                manifest.record(file_hash, img_path, "failed")
+                manifest.commit()
                 continue
                 
             print("\nExtracted Data:")
@@ -212,24 +196,29 @@ class PANProcessor:
                 print("Try Again!!!")
                 if len(missing) >= 2:
                     print("Please try again with a clearer image!")
+                manifest.record(file_hash, img_path, "missing", missing=missing)
+                manifest.commit()
                 continue
                 
             # Save to JSON
-            filename = f"pan_{os.path.splitext(os.path.basename(img_path))[0]}_{int(time.time())}"
+            filename = f"pan_{os.path.splitext(os.path.basename(img_path))[0]}_{file_hash[:16]}"
             saved_path = self.save_to_json(data, filename)
             
             if saved_path:
                 success_count += 1
+                manifest.record(file_hash, img_path, "saved", output=saved_path)
                 print(f"\n✅ Successfully saved to: {saved_path}")
             else:
+                manifest.record(file_hash, img_path, "failed")
                 print("🛑 Failed to save JSON file")
+            manifest.commit()
 
-        print(f"\nProcessing complete! Successful: {success_count}/{total_files}")
+        print(f"\nProcessing complete! Successful: {success_count}/{processed}")
+        timing.report()
 
         
-    def save_to_json(self, data, filename):
+    def save_to_json(self, data, filename, output_dir="output"):
         """Save extracted data to JSON file"""
-        output_dir = "output"
         os.makedirs(output_dir, exist_ok=True)
         
         try:
@@ -250,5 +239,6 @@ if __name__ == "__main__":
                      glob.glob(os.path.join(input_path, "*.[jJ][pP][eE][gG]*"))
     else:
         image_paths = [input_path]
-    
-    processor.process_batch(image_paths)
+
+    workers = int(input("Number of parallel workers [1]: ").strip() or 1)
+    processor.process_batch(image_paths, workers=workers)
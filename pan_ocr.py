@@ -3,8 +3,8 @@ import cv2
 import numpy as np
 import pytesseract
 from ultralytics import YOLO
-import re
-from datetime import datetime
+from pan_parse import parse_dob, parse_pan, parse_name
+from pan_batch import BatchManifest, BatchTiming, run_batch
 from collections import Counter
 import os
 import glob
@@ -12,24 +12,23 @@ from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
 
 class PANProcessor:
-    def __init__(self):
+    def __init__(self, dedup_index=None, cpu_budget=None):
         self.class_map = {
             0: "dob",
             1: "father_name",
             2: "name",
             3: "pan_number"
         }
-        self.date_formats = [
-            (r'(\d{1,2})[/\-\.\s](\d{1,2})[/\-\.\s](\d{4})', 'dmy'),
-            (r'(\d{4})[/\-\.\s](\d{1,2})[/\-\.\s](\d{1,2})', 'ymd'),
-            (r'(\d{1,2})[/\-\.\s]([A-Za-z]{3,})[/\-\.\s](\d{4})', 'dby'),
-        ]
-        self.month_map = {
-            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-        }
         self.excel_headers = ["Name", "Father's Name", "PAN Number", "DOB"]
+        # Hidden column with each row's file hash, so a resumed batch never writes a row twice
+        self.hash_column = len(self.excel_headers) + 1
+        self.cpu_budget = cpu_budget
+        # Processors sharing a budget apply it once for the process
+        if cpu_budget is not None and not cpu_budget.applied:
+            cpu_budget.apply()
+            print(f"CPU budget: {cpu_budget}")
         self.model = YOLO("best.pt")
+        self.dedup_index = dedup_index
         pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
     def preprocess(self, image):
@@ -45,100 +44,18 @@ class PANProcessor:
         except cv2.error:
             return None
 
-    def _validate_date(self, day, month, year):
-        """Check if date components form valid date"""
-        try:
-            if 1900 <= year <= datetime.now().year + 10:
-                datetime(year=year, month=month, day=day)
-                return True
-        except ValueError:
-            return False
-        return False
-
     def _process_dob(self, text):
-        """Final optimized date parsing with enhanced validation"""
-        text = text.replace('O', '0').replace('o', '0').replace('l', '1')
-        text = re.sub(r'[^\d/\-\.A-Za-z]', '', text).strip()
-        
-        # Enhanced date patterns with priority
-        patterns = [
-            # DD/MM/YYYY with any separator
-            (r'(\d{2})[./\-](\d{2})[./\-](\d{4})', 'dmy'),
-            # MM/DD/YYYY with any separator
-            (r'(\d{2})[./\-](\d{2})[./\-](\d{4})', 'mdy'),
-            # Month name format (DD-Mon-YYYY)
-            (r'(\d{1,2})[./\- ]([A-Za-z]{3,})[./\- ](\d{4})', 'dby'),
-            # Year-first format
-            (r'(\d{4})[./\-](\d{2})[./\-](\d{2})', 'ymd'),
-        ]
-
-        best_date = None
-        max_confidence = 0
-        
-        for pattern, fmt in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    if fmt == 'dmy':
-                        day, month, year = map(int, match.groups())
-                    elif fmt == 'mdy':
-                        month, day, year = map(int, match.groups())
-                    elif fmt == 'dby':
-                        day = int(match.group(1))
-                        month_str = match.group(2)[:3].lower()
-                        month = self.month_map.get(month_str)
-                        year = int(match.group(3))
-                    elif fmt == 'ymd':
-                        year, month, day = map(int, match.groups())
-                    
-                    # Validate date components
-                    if not (1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= datetime.now().year):
-                        continue
-                        
-                    # Validate actual date existence
-                    datetime(year=year, month=month, day=day)
-                    confidence = len(text.strip())  # Longer matches are better
-                    
-                    if confidence > max_confidence:
-                        best_date = f"{day:02d}/{month:02d}/{year}"
-                        max_confidence = confidence
-                        
-                except (ValueError, KeyError, TypeError):
-                    continue
-
-        return best_date or ""
+        """Parse date of birth via the shared field parser"""
+        return parse_dob(text)
 
     def _process_pan(self, text):
-        """Robust PAN validation with OCR correction"""
-        CHAR_MAP = {'0':'O','1':'I','2':'Z','4':'A','5':'S','8':'B',
-                   'B':'8','D':'0','I':'1','O':'0','S':'5','Z':'2'}
-        cleaned = re.sub(r'[^A-Z0-9]', '', text.upper())
-        if len(cleaned) != 10:
-            return ""
-        
-        parts = [
-            [c if c.isalpha() else CHAR_MAP.get(c, c) for c in cleaned[:5]],
-            [c if c.isdigit() else CHAR_MAP.get(c, c) for c in cleaned[5:9]],
-            [CHAR_MAP.get(cleaned[9], '') if not cleaned[9].isalpha() else cleaned[9]]
-        ]
-        
-        pan = ''.join([''.join(p) for p in parts])
-        if re.match(r'^[A-Z]{5}[0-9]{4}[A-Z]$', pan):
-            return pan
-        return ""
+        """Validate PAN number via the shared field parser"""
+        return parse_pan(text)
 
     def _process_name(self, text):
-        """Validate names with OCR correction"""
-        text = re.sub(r'[^A-Za-z\s\']', '', text)
-        if re.fullmatch(r'^[Oo]+$', text.strip()):
-            return ""
-        text = re.sub(r'\s+', ' ', text).strip().title()
-        return text if len(text) >= 2 and not any(c.isdigit() for c in text) else ""
-        '''text = re.sub(r'[Oo]', '', text)
-        text = re.sub(r'[^A-Za-z\s\'\-]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip().title()
-        return text if len(text) >= 2 and not any(c.isdigit() for c in text) else ""
-'''
+        """Validate names via the shared field parser"""
+        return parse_name(text)
+
     def process_image(self, image_path):
         """Process single image with proper bounding box handling"""
         try:
@@ -146,6 +63,18 @@ class PANProcessor:
             if img is None:
                 print(f"Could not read image: {image_path}")
                 return {}, list(self.class_map.values())
+
+            # Near-duplicate check before running detection
+            image_hash = None
+            if self.dedup_index is not None:
+                image_hash = self.dedup_index.hash_image(img)
+                match = self.dedup_index.lookup(image_hash)
+                if match:
+                    self.dedup_index.flag(match, source=image_path)
+                    print(f"⚠️ Near-duplicate of {match['source']} (distance {match['distance']}), flagged for review")
+                    missing = [field for field, value in match["record"].items() if not value]
+                    record = {**match["record"], "duplicate_of": match["source"], "distance": match["distance"]}
+                    return record, missing
             
             results = self.model(img)[0]
             extracted = {v: "" for v in self.class_map.values()}
@@ -196,39 +125,66 @@ class PANProcessor:
                         extracted[field] = max(candidates[field], key=len, default="")
 
             missing = [field for field, value in extracted.items() if not value]
+            if self.dedup_index is not None and not missing:
+                self.dedup_index.add(image_hash, extracted, source=image_path)
             return extracted, missing
 
         except Exception as e:
             print(f"Error processing {image_path}: {str(e)}")
             return {}, list(self.class_map.values())
         
-    def process_batch(self, image_paths, output_file="pan_records.xlsx"):
-        """Process multiple images and save to Excel"""
+    def process_batch(self, image_paths, output_file="pan_records.xlsx", workers=1, checkpoint_every=100):
+        """Process multiple images and save to Excel
+
+        Progress is checkpointed in a manifest next to the Excel file, so an
+        interrupted run resumes with the first unprocessed image. The workbook
+        is saved every checkpoint_every records before they are marked done.
+        Each row also keeps its file hash in a hidden column, so rows saved
+        just before a crash are marked done on resume rather than added again,
+        and images whose rows are missing from the workbook are processed again.
+        """
         try:
             wb, sheet = self._init_excel(output_file)
+            manifest = BatchManifest(f"{output_file}.manifest.jsonl")
+
+            # Trust the workbook over the manifest: rows saved just before a crash are
+            # marked done, and rows missing from a deleted or replaced workbook are redone
+            manifest.reconcile(self._saved_hashes(sheet))
+
             success_count = 0
+            processed = 0
+            timing = BatchTiming(workers)
+
+            def checkpoint():
+                self._finalize_excel(wb, output_file)
+                manifest.commit()
             
-            for idx, img_path in enumerate(image_paths, 1):
-                print(f"\nProcessing image {idx}/{len(image_paths)}: {os.path.basename(img_path)}")
-                data, missing = self.process_image(img_path)
+            for idx, img_path, file_hash, data, missing, elapsed in run_batch(self, image_paths, manifest, workers, timing):
+                print(f"\nProcessed image {idx}/{len(image_paths)}: {os.path.basename(img_path)}")
+                processed += 1
                 
-                if data:
-                    '''print("\nExtracted Information:")
-                    for k, v in data.items():
-                        print(f"{k.upper():<12}: {v if v else 'Not Detected'}")'''
+                if not data:
+                    manifest.record(file_hash, img_path, "failed")
+                    continue
+
+                if missing:
+                    print(f"\nMissing fields: {', '.join(missing)}")
+                    if len(missing) >= 2:
+                        print("❌Error: Try again by using clear image")
+                    manifest.record(file_hash, img_path, "missing", missing=missing)
+                    continue
 
-                    if missing:
-                        print(f"\nMissing fields: {', '.join(missing)}")
-                        if len(missing) >= 2:
-                            print("❌Error: Try again by using clear image")
-                        continue
+                self._write_excel_row(sheet, data, file_hash)
+                manifest.record(file_hash, img_path, "saved")
+                success_count += 1
+                print("\nAll fields detected! Record saved to Excel.")
 
-                    self._write_excel_row(sheet, data)
-                    success_count += 1
-                    print("\nAll fields detected! Record saved to Excel.")
+                if success_count % checkpoint_every == 0:
+                    checkpoint()
 
-            self._finalize_excel(wb, output_file)
-            print(f"\n✅Processing complete. Successful records: {success_count}/{len(image_paths)}")
+            checkpoint()
+            print(f"\n✅Processing complete. Successful records: {success_count}/{processed}")
+            timing.report()
             return True
         except Exception as e:
             print(f"❌Batch processing failed: {str(e)}")
@@ -250,15 +206,23 @@ class PANProcessor:
             sheet = wb.active
             sheet.title = "PAN Data"
             sheet.append(self.excel_headers)
+        if sheet.cell(row=1, column=1).value == self.excel_headers[0]:
+            sheet.cell(row=1, column=self.hash_column, value="File Hash")
         return wb, sheet
 
-    def _write_excel_row(self, sheet, data):
+    def _saved_hashes(self, sheet):
+        """File hashes of rows already in the sheet"""
+        hashes = (sheet.cell(row=row, column=self.hash_column).value for row in range(2, sheet.max_row + 1))
+        return {h for h in hashes if h}
+
+    def _write_excel_row(self, sheet, data, file_hash=None):
         """Write single data row to Excel sheet"""
         row = [
             data.get("name", ""),
             data.get("father_name", ""),
             data.get("pan_number", ""),
-            data.get("dob", "")
+            data.get("dob", ""),
+            file_hash
         ]
         sheet.append(row)
 
@@ -271,7 +235,10 @@ class PANProcessor:
                 cell_value = str(sheet.cell(row=row, column=col).value)
                 max_len = max(max_len, len(cell_value))
             sheet.column_dimensions[get_column_letter(col)].width = max_len + 2
-        wb.save(output_file)
+        sheet.column_dimensions[get_column_letter(self.hash_column)].hidden = True
+        # Save to a temporary file first so a crash never leaves a half-written workbook
+        wb.save(f"{output_file}.tmp")
+        os.replace(f"{output_file}.tmp", output_file)
 
 if __name__ == "__main__":
     processor = PANProcessor()
@@ -282,5 +249,6 @@ if __name__ == "__main__":
                      glob.glob(os.path.join(input_path, "*.[jJ][pP][eE][gG]*"))
     else:
         image_paths = [input_path]
-    
-    processor.process_batch(image_paths)
+
+    workers = int(input("Number of parallel workers [1]: ").strip() or 1)
+    processor.process_batch(image_paths, workers=workers)
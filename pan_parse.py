@@ -0,0 +1,133 @@
+# pan_parse.py
+import re
+import time
+from datetime import date, datetime
+
+MONTH_MAP = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# OCR character corrections
+DOB_FIX = str.maketrans('Ool', '001')
+TO_ALPHA = str.maketrans('012458', 'OIZASB')
+TO_DIGIT = str.maketrans('BDIOSZ', '801052')
+
+# Date patterns in priority order; 'dmy' falls back to month-first when the day-first date is invalid
+DATE_FORMATS = [
+    (re.compile(r'(\d{1,2})[/\-\.\s](\d{1,2})[/\-\.\s](\d{4})'), 'dmy'),
+    (re.compile(r'(\d{4})[/\-\.\s](\d{1,2})[/\-\.\s](\d{1,2})'), 'ymd'),
+    (re.compile(r'(\d{1,2})[/\-\.\s]([A-Za-z]{3,})[/\-\.\s](\d{4})'), 'dby'),
+]
+
+DOB_CLEAN = re.compile(r'[^0-9/\-\.\sA-Za-z]')
+NON_DIGIT = re.compile(r'\D')
+PAN_CLEAN = re.compile(r'[^A-Z0-9]')
+PAN_FORMAT = re.compile(r'[A-Z]{5}[0-9]{4}[A-Z]')
+NAME_CLEAN = re.compile(r"[^A-Za-z\s']")
+ONLY_O = re.compile(r'[Oo]+')
+WHITESPACE = re.compile(r'\s+')
+
+MIN_YEAR = 1900
+DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+_current_year = None
+_year_ends_at = 0.0
+
+
+def current_year():
+    """Current local year, re-read only once the cached year has ended"""
+    global _current_year, _year_ends_at
+    if time.time() >= _year_ends_at:
+        _current_year = date.today().year
+        _year_ends_at = datetime(_current_year + 1, 1, 1).timestamp()
+    return _current_year
+
+
+def validate_date(day, month, year):
+    """Check if date components form a valid, non-future birth date"""
+    if not (MIN_YEAR <= year <= current_year() and 1 <= month <= 12):
+        return False
+    if not 1 <= day <= DAYS_IN_MONTH[month - 1]:
+        return False
+    if month == 2 and day == 29:
+        return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    return True
+
+
+def parse_dob(text):
+    """Parse an OCR'd date of birth into DD/MM/YYYY"""
+    text = DOB_CLEAN.sub('', text.translate(DOB_FIX))
+
+    # Handle 8-digit date format
+    digits = NON_DIGIT.sub('', text)
+    if len(digits) == 8:
+        first, second, year = int(digits[:2]), int(digits[2:4]), int(digits[4:])
+        if validate_date(first, second, year):
+            return f"{first:02d}/{second:02d}/{year}"
+        if validate_date(second, first, year):
+            return f"{second:02d}/{first:02d}/{year}"
+
+    for pattern, fmt in DATE_FORMATS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        if fmt == 'dmy':
+            day, month, year = map(int, match.groups())
+            if not validate_date(day, month, year):
+                day, month = month, day
+        elif fmt == 'ymd':
+            year, month, day = map(int, match.groups())
+        else:
+            day = int(match.group(1))
+            month = MONTH_MAP.get(match.group(2)[:3].lower(), 0)
+            year = int(match.group(3))
+
+        if validate_date(day, month, year):
+            return f"{day:02d}/{month:02d}/{year}"
+
+    return ""
+
+
+def parse_pan(text):
+    """Validate a PAN number with OCR correction"""
+    cleaned = PAN_CLEAN.sub('', text.upper())
+    if len(cleaned) != 10:
+        return ""
+
+    pan = cleaned[:5].translate(TO_ALPHA) + cleaned[5:9].translate(TO_DIGIT) + cleaned[9].translate(TO_ALPHA)
+    return pan if PAN_FORMAT.fullmatch(pan) else ""
+
+
+def parse_name(text):
+    """Validate names with OCR correction"""
+    text = NAME_CLEAN.sub('', text)
+    if ONLY_O.fullmatch(text.strip()):
+        return ""
+    text = WHITESPACE.sub(' ', text).strip().title()
+    return text if len(text) >= 2 else ""
+
+
+FIELD_PARSERS = {
+    "dob": parse_dob,
+    "father_name": parse_name,
+    "name": parse_name,
+    "pan_number": parse_pan,
+}
+
+
+def parse_field(field, text):
+    """Parse raw OCR text for a single field"""
+    return FIELD_PARSERS[field](text)
+
+
+def parse_fields(texts_by_field):
+    """Parse raw OCR strings in bulk.
+
+    Takes a mapping of field name to an iterable of raw strings and returns a
+    mapping of field name to the list of parsed values, in the same order.
+    """
+    return {
+        field: list(map(FIELD_PARSERS[field], texts))
+        for field, texts in texts_by_field.items()
+    }
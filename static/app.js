@@ -2,6 +2,11 @@ const dropZone = document.getElementById('dropZone');
 const fileInput = document.getElementById('fileInput');
 const processingContainer = document.querySelector('.processing-container');
 
+// Preferred input size and formats advertised by the server
+const inputConfig = axios.get('/api/config')
+    .then((response) => response.data)
+    .catch(() => null);
+
 // Drag and drop handlers
 dropZone.addEventListener('dragover', (e) => {
     e.preventDefault();
@@ -24,24 +29,148 @@ fileInput.addEventListener('change', (e) => {
     if (file) handleFile(file);
 });
 
+function canvasToBlob(canvas, type, quality) {
+    return new Promise((resolve) => canvas.toBlob(resolve, type, quality));
+}
+
+// Downscale and re-encode the image before upload, falling back to the original file
+async function compressImage(file, config) {
+    if (!config || !file.type.startsWith('image/') || !window.createImageBitmap) return file;
+
+    try {
+        const bitmap = await createImageBitmap(file);
+        const scale = Math.min(1, config.max_dimension / Math.max(bitmap.width, bitmap.height));
+        const canvas = document.createElement('canvas');
+        canvas.width = Math.round(bitmap.width * scale);
+        canvas.height = Math.round(bitmap.height * scale);
+        canvas.getContext('2d').drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+        bitmap.close();
+
+        for (const type of config.formats) {
+            const blob = await canvasToBlob(canvas, type, config.quality);
+            // toBlob silently falls back to PNG for unsupported types
+            if (!blob || blob.type !== type) continue;
+            // Try the next format before giving up on compression
+            if (blob.size >= file.size) continue;
+
+            const name = file.name.replace(/\.[^.]*$/, '') + '.' + type.split('/')[1].replace('jpeg', 'jpg');
+            return new File([blob], name, {type});
+        }
+    } catch (error) {
+        console.warn('Image compression failed, uploading original:', error);
+    }
+    return file;
+}
+
+const STAGE_TEXT = {
+    upload: 'Uploaded',
+    read: 'Reading image',
+    duplicate_check: 'Checking duplicates',
+    detect: 'Detecting fields',
+    ocr: 'Reading text',
+    duplicate: 'Duplicate found',
+    done: 'Finishing'
+};
+
+// Whether fetch responses can be read incrementally in this browser
+const CAN_STREAM = 'body' in Response.prototype && typeof ReadableStream !== 'undefined';
+
+// Split server-sent events off the front of the buffer and dispatch them.
+// Returns the final result payload if it was among them, and the unparsed rest.
+function dispatchEvents(buffer, handlers) {
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const message = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        for (const line of message.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        const payload = data ? JSON.parse(data) : {};
+
+        if (event === 'result') return {result: payload, buffer};
+        handlers[event]?.(payload);
+    }
+    return {result: null, buffer};
+}
+
+// POST to the streaming endpoint and dispatch server-sent events as they arrive.
+// Browsers that cannot read the body incrementally get all events once the response ends.
+async function processStream(formData, handlers) {
+    const response = await fetch('/api/process/stream', {method: 'POST', body: formData});
+    if (!response.ok) return response.json().catch(() => ({}));
+
+    if (!CAN_STREAM || !response.body) {
+        const {result} = dispatchEvents(await response.text(), handlers);
+        return result || {error: 'Connection closed before processing finished'};
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const {value, done} = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, {stream: true});
+
+        const parsed = dispatchEvents(buffer, handlers);
+        if (parsed.result) return parsed.result;
+        buffer = parsed.buffer;
+    }
+    return {error: 'Connection closed before processing finished'};
+}
+
 async function handleFile(file) {
     document.querySelector('.processing-container').classList.remove('hidden');
     document.getElementById('fileInfo').textContent = `Processing: ${file.name}`;
     document.querySelector('.spinner').style.display = 'block';
 
+    const started = performance.now();
+    const upload = await compressImage(file, await inputConfig);
+    const compressed = performance.now();
+
     const formData = new FormData();
-    formData.append('file', file);
+    formData.append('file', upload);
 
     try {
-        const response = await axios.post('/api/process', formData, {
-            headers: {'Content-Type': 'multipart/form-data'}
+        let firstField = null;
+        const result = await processStream(formData, {
+            stage: (e) => {
+                const stage = STAGE_TEXT[e.stage] || e.stage;
+                document.getElementById('fileInfo').textContent =
+                    `Processing: ${file.name} - ${stage} (${Math.round(e.progress * 100)}%)`;
+            },
+            field: (e) => {
+                if (firstField === null) {
+                    firstField = performance.now();
+                    renderResults(file);
+                }
+                setField(e.field, e.value);
+            }
         });
 
-        if (response.data.status === 'success') {
-            // Pass both the data and response to showResults
-            showResults(response.data.data, file, response.data); 
+        const finished = performance.now();
+        console.info(
+            `Upload: ${file.size} -> ${upload.size} bytes, ` +
+            `compress ${Math.round(compressed - started)} ms, ` +
+            `first field ${firstField === null ? '-' : Math.round(firstField - compressed) + ' ms'}, ` +
+            `request ${Math.round(finished - compressed)} ms ` +
+            `(server ${result.metrics?.server_ms ?? '?'} ms), ` +
+            `total ${Math.round(finished - started)} ms`
+        );
+
+        if (result.status === 'success') {
+            showResults(result.data, file);
+            if (result.duplicate) {
+                document.getElementById('fileInfo').textContent =
+                    `PAN Details (near-duplicate of ${result.duplicate.duplicate_of}, flagged for review):`;
+            }
         } else {
-            showError(response.data.message);
+            showError(result.message || result.error || 'Processing failed! Try again with Clear image.');
         }
     } catch (error) {
         showError(error.response?.data?.error || 'Processing failed! Try again with Clear image.');
@@ -50,38 +179,37 @@ async function handleFile(file) {
     }
 }
 
-function showResults(data, file) {
+// Show the preview and empty fields, which are filled in as results arrive
+function renderResults(file) {
     const resultsDiv = document.getElementById('results');
-    const reader = new FileReader();
-    
-    reader.onload = (e) => {
-        // Change the header to "PAN Details" and remove paths
-        document.getElementById('fileInfo').textContent = "PAN Details:";
-        
-        resultsDiv.innerHTML = `
-            <div class="image-preview">
-                <img src="${e.target.result}" alt="Uploaded PAN Card">
+    resultsDiv.innerHTML = `
+        <div class="image-preview">
+            <img id="preview" alt="Uploaded PAN Card">
+        </div>
+        <div class="results">
+            <div class="result-item">
+                <label>Card Holder Name:</label>
+                <input id="field-name" placeholder="Waiting..." readonly>
+            </div>
+            <div class="result-item">
+                <label>Father's Name:</label>
+                <input id="field-father_name" placeholder="Waiting..." readonly>
+            </div>
+            <div class="result-item">
+                <label>PAN Number:</label>
+                <input id="field-pan_number" placeholder="Waiting..." readonly>
             </div>
-            <div class="results">
-                <div class="result-item">
-                    <label>Card Holder Name:</label>
-                    <input value="${data.name || 'Not Detected'}" readonly>
-                </div>
-                <div class="result-item">
-                    <label>Father's Name:</label>
-                    <input value="${data.father_name || 'Not Detected'}" readonly>
-                </div>
-                <div class="result-item">
-                    <label>PAN Number:</label>
-                    <input value="${data.pan_number || 'Not Detected'}" readonly>
-                </div>
-                <div class="result-item">
-                    <label>Date of Birth:</label>
-                    <input value="${data.dob || 'Not Detected'}" readonly>
-                </div>
-                <button class="try-again" onclick="location.reload()">Try Another One</button>
+            <div class="result-item">
+                <label>Date of Birth:</label>
+                <input id="field-dob" placeholder="Waiting..." readonly>
             </div>
-        `;
+            <button class="try-again" onclick="location.reload()">Try Another One</button>
+        </div>
+    `;
+
+    const reader = new FileReader();
+    reader.onload = (e) => {
+        document.getElementById('preview').src = e.target.result;
     };
     
     reader.onerror = (error) => {
@@ -92,6 +220,21 @@ function showResults(data, file) {
     reader.readAsDataURL(file);
 }
 
+function setField(field, value) {
+    const input = document.getElementById(`field-${field}`);
+    if (input) input.value = value || 'Not Detected';
+}
+
+function showResults(data, file) {
+    if (!document.getElementById('field-name')) renderResults(file);
+
+    // Change the header to "PAN Details" and remove paths
+    document.getElementById('fileInfo').textContent = "PAN Details:";
+    for (const field of ['name', 'father_name', 'pan_number', 'dob']) {
+        setField(field, data[field]);
+    }
+}
+
 function showError(message) {
     const resultsDiv = document.getElementById('results');
     resultsDiv.innerHTML = `
@@ -0,0 +1,93 @@
+import pytest
+from pan_batch import BatchManifest, BatchTiming, file_hash, run_batch
+
+
+class FakeProcessor:
+    """Stands in for PANProcessor; the 'extracted' name is the file's text"""
+
+    def __init__(self, cpu_budget=None):
+        pass
+
+    def process_image(self, image_path):
+        with open(image_path) as f:
+            return {"name": f.read()}, []
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"card_{i}.jpg"
+        path.write_text(f"Card {i}")
+        paths.append(str(path))
+    return paths
+
+
+def run(images, manifest, output, writes, stop_after=None):
+    """Mimic pan_ocr.process_batch: write a row, checkpoint every 2 rows"""
+    manifest.reconcile(output)
+    for count, (idx, path, h, data, missing, elapsed) in enumerate(run_batch(FakeProcessor(), images, manifest), 1):
+        output[h] = data
+        writes.append(h)
+        if count == stop_after:
+            return  # Crash after the row is saved but before the manifest is committed
+        manifest.record(h, path, "saved")
+        if count % 2 == 0:
+            manifest.commit()
+    manifest.commit()
+
+
+def test_resume_after_interrupt_writes_each_image_once(tmp_path, images):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    output, writes = {}, []
+
+    run(images, BatchManifest(manifest_path), output, writes, stop_after=3)
+    assert len(writes) == 3
+
+    run(images, BatchManifest(manifest_path), output, writes)
+    assert sorted(writes) == sorted(file_hash(p) for p in images)
+    assert [output[file_hash(p)]["name"] for p in images] == [f"Card {i}" for i in range(5)]
+
+
+def test_fresh_output_reprocesses_saved_images(tmp_path, images):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    output, writes = {}, []
+    run(images, BatchManifest(manifest_path), output, writes)
+
+    # Workbook deleted or replaced, manifest kept
+    output, writes = {}, []
+    manifest = BatchManifest(manifest_path)
+    assert manifest.reconcile(output) == len(images)
+    run(images, manifest, output, writes)
+    assert sorted(writes) == sorted(file_hash(p) for p in images)
+
+    # Nothing left to do after that
+    writes = []
+    run(images, BatchManifest(manifest_path), output, writes)
+    assert writes == []
+
+
+def test_reconcile_marks_output_rows_done(tmp_path, images):
+    manifest = BatchManifest(str(tmp_path / "manifest.jsonl"))
+    saved = {file_hash(images[0])}
+    assert manifest.reconcile(saved) == 0
+    assert manifest.is_done(file_hash(images[0]))
+    assert not manifest.is_done(file_hash(images[1]))
+
+
+def test_duplicate_files_processed_once(tmp_path, images):
+    copy = tmp_path / "copy.jpg"
+    copy.write_text("Card 0")
+    results = list(run_batch(FakeProcessor(), images + [str(copy)], BatchManifest(str(tmp_path / "m.jsonl"))))
+    assert [idx for idx, *_ in results] == [1, 2, 3, 4, 5]
+
+
+def test_parallel_run_keeps_order_and_measures_serial_baseline(tmp_path, images):
+    pytest.importorskip("torch")
+    pytest.importorskip("cv2")
+    timing = BatchTiming(workers=2)
+    results = list(run_batch(FakeProcessor(), images, BatchManifest(str(tmp_path / "m.jsonl")),
+                             workers=2, timing=timing, serial_sample=2))
+    assert [data["name"] for _, _, _, data, _, _ in results] == [f"Card {i}" for i in range(5)]
+    assert len(timing.serial_times) == 2
+    assert timing.pool_count == 3
@@ -0,0 +1,135 @@
+import random
+import pytest
+from pan_dedup import PerceptualIndex, dhash, hamming
+
+RECORD = {"name": "Rahul Kumar", "father_name": "Suresh Kumar", "pan_number": "ABCDE1234F", "dob": "12/05/1990"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = PerceptualIndex(str(tmp_path / "hashes.db"), threshold=10)
+    yield idx
+    idx.close()
+
+
+def flip_bits(h, positions):
+    for pos in positions:
+        h ^= 1 << pos
+    return h
+
+
+def spread_positions(index, count, rng):
+    """One flipped bit in each of `count` different chunks, the worst case for lookup"""
+    chunks = rng.sample(range(index.chunks), count)
+    return [c * index.chunk_bits + rng.randrange(index.chunk_bits) for c in chunks]
+
+
+def test_exact_match(index):
+    h = random.Random(0).getrandbits(256)
+    index.add(h, RECORD, source="a.jpg")
+    match = index.lookup(h)
+    assert match["distance"] == 0
+    assert match["source"] == "a.jpg"
+    assert match["record"] == RECORD
+
+
+def test_found_at_threshold(index):
+    rng = random.Random(1)
+    for _ in range(50):
+        h = rng.getrandbits(256)
+        index.add(h, RECORD)
+        query = flip_bits(h, spread_positions(index, index.threshold, rng))
+        assert hamming(h, query) == index.threshold
+        match = index.lookup(query)
+        assert match is not None and match["distance"] == index.threshold
+
+
+def test_not_found_above_threshold(index):
+    rng = random.Random(2)
+    for _ in range(50):
+        h = rng.getrandbits(256)
+        index.add(h, RECORD)
+        query = flip_bits(h, spread_positions(index, index.threshold + 1, rng))
+        assert index.lookup(query) is None
+
+
+def test_pigeonhole_any_bits_within_threshold(index):
+    """Any flips up to the threshold leave one chunk intact, so lookup always finds the entry"""
+    rng = random.Random(3)
+    stored = [rng.getrandbits(256) for _ in range(200)]
+    for h in stored:
+        index.add(h, RECORD)
+    for h in stored:
+        query = flip_bits(h, rng.sample(range(256), rng.randint(0, index.threshold)))
+        match = index.lookup(query)
+        assert match is not None and match["distance"] == hamming(h, query)
+
+
+def test_returns_closest_match(index):
+    rng = random.Random(4)
+    h = rng.getrandbits(256)
+    index.add(flip_bits(h, [0, 1, 2, 3]), RECORD, source="far.jpg")
+    index.add(flip_bits(h, [0]), RECORD, source="near.jpg")
+    assert index.lookup(h)["source"] == "near.jpg"
+
+
+def test_unrelated_hashes_do_not_match(index):
+    rng = random.Random(5)
+    for _ in range(1000):
+        index.add(rng.getrandbits(256), RECORD)
+    assert all(index.lookup(rng.getrandbits(256)) is None for _ in range(200))
+
+
+def test_shared_template_chunks_are_skipped(tmp_path):
+    """Cards share a layout, so half the chunks hold the same value for every entry"""
+    idx = PerceptualIndex(str(tmp_path / "hashes.db"), threshold=5, max_bucket=50)
+    rng = random.Random(7)
+    template = rng.getrandbits(128)
+    stored = [(rng.getrandbits(128) << 128) | template for _ in range(2000)]
+    for h in stored:
+        idx.add(h, RECORD)
+
+    for h in stored[:50]:
+        # Up to threshold flips, all in the card-specific chunks
+        query = flip_bits(h, rng.sample(range(128, 256), rng.randint(0, idx.threshold)))
+        assert len(idx._candidates(query)) < 50
+        match = idx.lookup(query)
+        assert match is not None and match["distance"] == hamming(h, query)
+
+    # A new card on the same template matches nothing and scans almost nothing
+    query = (rng.getrandbits(128) << 128) | template
+    assert len(idx._candidates(query)) < 50
+    assert idx.lookup(query) is None
+    idx.close()
+
+
+def test_dhash_of_same_image_matches():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    image = np.random.default_rng(0).integers(0, 255, (200, 300, 3), dtype=np.uint8)
+    assert dhash(image) == dhash(image.copy())
+    assert dhash(image).bit_length() <= 256
+    assert dhash(None) is None
+
+
+def test_persists_and_flags(tmp_path):
+    path = str(tmp_path / "hashes.db")
+    h = random.Random(6).getrandbits(256)
+    idx = PerceptualIndex(path)
+    idx.add(h, RECORD, source="a.jpg")
+    idx.close()
+
+    idx = PerceptualIndex(path)
+    match = idx.lookup(flip_bits(h, [7]))
+    idx.flag(match, source="b.jpg")
+    assert len(idx) == 1
+    assert idx.review_flags()[0]["matched_source"] == "a.jpg"
+    idx.close()
+
+
+def test_rejects_invalid_settings(tmp_path):
+    with pytest.raises(ValueError):
+        PerceptualIndex(str(tmp_path / "a.db"), threshold=16, chunks=16)
+    PerceptualIndex(str(tmp_path / "b.db"), chunks=16).close()
+    with pytest.raises(ValueError):
+        PerceptualIndex(str(tmp_path / "b.db"), threshold=3, chunks=8)
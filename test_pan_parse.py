@@ -0,0 +1,270 @@
+import random
+import re
+import string
+from datetime import datetime, date
+import pytest
+from pan_parse import parse_dob, parse_pan, parse_name, parse_fields, current_year
+
+# Frozen copies of the parsers pan_parse replaced, kept to pin its behaviour against them
+
+MONTH_MAP = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+
+def legacy_json_validate_date(day, month, year):
+    try:
+        if 1900 <= year <= datetime.now().year + 10:
+            datetime(year=year, month=month, day=day)
+            return True
+    except ValueError:
+        return False
+    return False
+
+
+def legacy_json_dob(text):
+    """pan_json.PANProcessor._process_dob"""
+    date_formats = [
+        (r'(\d{1,2})[/\-\.\s](\d{1,2})[/\-\.\s](\d{4})', 'dmy'),
+        (r'(\d{4})[/\-\.\s](\d{1,2})[/\-\.\s](\d{1,2})', 'ymd'),
+        (r'(\d{1,2})[/\-\.\s]([A-Za-z]{3,})[/\-\.\s](\d{4})', 'dby'),
+    ]
+    text = text.replace('O', '0').replace('o', '0').replace('l', '1')
+    text = re.sub(r'[^0-9/\-\.\sA-Za-z]', '', text)
+
+    digits_only = re.sub(r'\D', '', text)
+    if len(digits_only) == 8:
+        day = int(digits_only[:2])
+        month = int(digits_only[2:4])
+        year = int(digits_only[4:8])
+        if legacy_json_validate_date(day, month, year):
+            return f"{day:02d}/{month:02d}/{year}"
+
+        month = int(digits_only[:2])
+        day = int(digits_only[2:4])
+        if legacy_json_validate_date(day, month, year):
+            return f"{day:02d}/{month:02d}/{year}"
+
+    for pattern, fmt in date_formats:
+        match = re.search(pattern, text)
+        if match:
+            try:
+                if fmt == 'dmy':
+                    day, month, year = map(int, match.groups())
+                elif fmt == 'ymd':
+                    year, month, day = map(int, match.groups())
+                elif fmt == 'dby':
+                    day = int(match.group(1))
+                    month_str = match.group(2)[:3].lower()
+                    month = MONTH_MAP.get(month_str, 0)
+                    year = int(match.group(3))
+
+                if legacy_json_validate_date(day, month, year):
+                    return f"{day:02d}/{month:02d}/{year}"
+            except (ValueError, KeyError):
+                continue
+
+    return ""
+
+
+def legacy_ocr_dob(text):
+    """pan_ocr.PANProcessor._process_dob"""
+    text = text.replace('O', '0').replace('o', '0').replace('l', '1')
+    text = re.sub(r'[^\d/\-\.A-Za-z]', '', text).strip()
+
+    patterns = [
+        (r'(\d{2})[./\-](\d{2})[./\-](\d{4})', 'dmy'),
+        (r'(\d{2})[./\-](\d{2})[./\-](\d{4})', 'mdy'),
+        (r'(\d{1,2})[./\- ]([A-Za-z]{3,})[./\- ](\d{4})', 'dby'),
+        (r'(\d{4})[./\-](\d{2})[./\-](\d{2})', 'ymd'),
+    ]
+
+    best_date = None
+    max_confidence = 0
+
+    for pattern, fmt in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                if fmt == 'dmy':
+                    day, month, year = map(int, match.groups())
+                elif fmt == 'mdy':
+                    month, day, year = map(int, match.groups())
+                elif fmt == 'dby':
+                    day = int(match.group(1))
+                    month_str = match.group(2)[:3].lower()
+                    month = MONTH_MAP.get(month_str)
+                    year = int(match.group(3))
+                elif fmt == 'ymd':
+                    year, month, day = map(int, match.groups())
+
+                if not (1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= datetime.now().year):
+                    continue
+
+                datetime(year=year, month=month, day=day)
+                confidence = len(text.strip())
+
+                if confidence > max_confidence:
+                    best_date = f"{day:02d}/{month:02d}/{year}"
+                    max_confidence = confidence
+
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    return best_date or ""
+
+
+def legacy_pan(text):
+    """_process_pan, identical in pan_json and pan_ocr"""
+    CHAR_MAP = {'0':'O','1':'I','2':'Z','4':'A','5':'S','8':'B',
+               'B':'8','D':'0','I':'1','O':'0','S':'5','Z':'2'}
+    cleaned = re.sub(r'[^A-Z0-9]', '', text.upper())
+    if len(cleaned) != 10:
+        return ""
+
+    parts = [
+        [c if c.isalpha() else CHAR_MAP.get(c, c) for c in cleaned[:5]],
+        [c if c.isdigit() else CHAR_MAP.get(c, c) for c in cleaned[5:9]],
+        [CHAR_MAP.get(cleaned[9], '') if not cleaned[9].isalpha() else cleaned[9]]
+    ]
+
+    pan = ''.join([''.join(p) for p in parts])
+    if re.match(r'^[A-Z]{5}[0-9]{4}[A-Z]$', pan):
+        return pan
+    return ""
+
+
+def legacy_name(text):
+    """_process_name, identical in pan_json and pan_ocr"""
+    text = re.sub(r'[^A-Za-z\s\']', '', text)
+    if re.fullmatch(r'^[Oo]+$', text.strip()):
+        return ""
+    text = re.sub(r'\s+', ' ', text).strip().title()
+    return text if len(text) >= 2 and not any(c.isdigit() for c in text) else ""
+
+
+# Random OCR-like inputs
+
+def random_pan(rng):
+    chars = string.ascii_uppercase + string.digits + " -.\n"
+    return "".join(rng.choice(chars) for _ in range(rng.choice([9, 10, 10, 10, 11, 12])))
+
+
+def random_name(rng):
+    chars = string.ascii_letters + "  '01O.-\n\t"
+    return "".join(rng.choice(chars) for _ in range(rng.randint(0, 24)))
+
+
+def random_dob(rng):
+    d, m, y = rng.randint(0, 35), rng.randint(0, 14), rng.randint(1890, current_year() + 15)
+    sep = rng.choice("/-. ")
+    text = rng.choice([
+        f"{d:02d}{sep}{m:02d}{sep}{y}",
+        f"{d}{sep}{m}{sep}{y}",
+        f"{y}{sep}{m:02d}{sep}{d:02d}",
+        f"{d:02d}{sep}{rng.choice(list(MONTH_MAP)).title()}{sep}{y}",
+        f"{d:02d}{m:02d}{y}",
+    ])
+    if rng.random() < 0.3:
+        text = text.replace("0", rng.choice("Oo0"), 1).replace("1", "l", 1)
+    if rng.random() < 0.2:
+        text = "DOB: " + text
+    return text
+
+
+def test_pan_matches_legacy():
+    rng = random.Random(0)
+    for _ in range(50000):
+        text = random_pan(rng)
+        assert parse_pan(text) == legacy_pan(text), text
+
+
+def test_name_matches_legacy():
+    rng = random.Random(1)
+    for _ in range(50000):
+        text = random_name(rng)
+        assert parse_name(text) == legacy_name(text), text
+
+
+def test_dob_differs_from_legacy_only_as_intended():
+    """Only two changes from pan_json: future years are rejected, month-first dates are accepted"""
+    rng = random.Random(2)
+    for _ in range(50000):
+        text = random_dob(rng)
+        new, old = parse_dob(text), legacy_json_dob(text)
+        if new == old:
+            continue
+        future_rejected = not new and int(old[-4:]) > current_year()
+        month_first_accepted = not old and int(new[:2]) > 12
+        assert future_rejected or month_first_accepted, (text, new, old)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12/05/1990", "12/05/1990"),
+    ("DOB: 12-05-1990", "12/05/1990"),
+    ("12.05.1990", "12/05/1990"),
+    ("12051990", "12/05/1990"),
+    ("1990-05-12", "12/05/1990"),
+    ("12 Mar 1987", "12/03/1987"),
+    ("l2/O5/199O", "12/05/1990"),
+    ("31/02/1990", ""),
+    ("garbage", ""),
+])
+def test_dob_agrees_with_legacy_json(text, expected):
+    assert parse_dob(text) == expected
+    assert legacy_json_dob(text) == expected
+
+
+@pytest.mark.parametrize("text", ["12/05/1990", "12-05-1990", "12.05.1990", "1990-05-12", "12-Mar-1987",
+                                  "l2/O5/199O", "31/02/1990", "12/13/1990", "garbage"])
+def test_dob_agrees_with_legacy_ocr(text):
+    assert parse_dob(text) == legacy_ocr_dob(text)
+
+
+def test_dob_month_first_two_digit_unchanged():
+    # Both old parsers already read this month-first (pan_json via its 8-digit path)
+    assert parse_dob("12/13/1990") == legacy_json_dob("12/13/1990") == legacy_ocr_dob("12/13/1990") == "13/12/1990"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("5/13/1981", "13/05/1981"),
+    ("9-14-1979", "14/09/1979"),
+    ("7.13.1960", "13/07/1960"),
+])
+def test_dob_accepts_single_digit_month_first(text, expected):
+    assert parse_dob(text) == expected
+    assert legacy_json_dob(text) == ""
+    assert legacy_ocr_dob(text) == ""
+
+
+def test_dob_rejects_future_years():
+    text = f"12/05/{current_year() + 1}"
+    assert parse_dob(text) == ""
+    assert legacy_json_dob(text) == f"12/05/{current_year() + 1}"
+    assert legacy_ocr_dob(text) == ""
+
+
+def test_dob_leap_years():
+    assert parse_dob("29/02/2000") == "29/02/2000"
+    assert parse_dob("29/02/1900") == ""
+    assert parse_dob("29/02/1996") == "29/02/1996"
+
+
+def test_current_year_is_today():
+    assert current_year() == date.today().year
+
+
+def test_parse_fields_keeps_order():
+    texts = {
+        "dob": ["12/05/1990", "bad", "1990-05-12"],
+        "pan_number": ["ABCDE1234F", "A8CDE12B4F", "short"],
+        "name": ["RAHUL KUMAR", "O"],
+        "father_name": ["suresh  kumar"],
+    }
+    assert parse_fields(texts) == {
+        "dob": ["12/05/1990", "", "12/05/1990"],
+        "pan_number": ["ABCDE1234F", "ABCDE1284F", ""],
+        "name": ["Rahul Kumar", ""],
+        "father_name": ["Suresh Kumar"],
+    }